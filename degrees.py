@@ -1,6 +1,9 @@
 import csv
+import os
 import sys
+from collections import OrderedDict
 
+import instrument
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -17,6 +20,9 @@ def load_data(directory):
     """
     Load data from CSV files into memory.
     """
+    # a full load rewrites every person and movie, so no cached path survives it
+    path_cache.clear()
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,6 +58,135 @@ def load_data(directory):
                 pass
 
 
+def load_delta(directory):
+    """
+    Apply changes from delta CSV files to the data in memory.
+
+    The directory may hold any of people.csv, movies.csv and stars.csv,
+    with the same columns as the full data plus an "action" column that
+    is either "add" (the default) or "remove". Each file is applied in row
+    order, people first, then movies, then stars, so a row removing an id
+    followed by one adding it back replaces it.
+    """
+    changes = {}
+    for table in ("people", "movies", "stars"):
+        changes[table] = []
+        path = os.path.join(directory, f"{table}.csv")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                action = row.get("action") or "add"
+                if action not in ("add", "remove"):
+                    raise ValueError(f"unknown action {action!r} in {path}")
+                changes[table].append((action, row))
+
+    for action, row in changes["people"]:
+        if action == "add":
+            add_person(row["id"], row["name"], row["birth"])
+        else:
+            remove_person(row["id"])
+    for action, row in changes["movies"]:
+        if action == "add":
+            add_movie(row["id"], row["title"], row["year"])
+        else:
+            remove_movie(row["id"])
+    for action, row in changes["stars"]:
+        if action == "remove":
+            remove_star(row["person_id"], row["movie_id"])
+            continue
+        add_star(row["person_id"], row["movie_id"])
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person, or updates the name and birth of an existing one.
+    """
+    if person_id in people:
+        names_remove(people[person_id]["name"], person_id)
+        people[person_id]["name"] = name
+        people[person_id]["birth"] = birth
+    else:
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+    names.setdefault(name.lower(), set()).add(person_id)
+
+
+def remove_person(person_id):
+    """
+    Removes a person and every movie they starred in from their record.
+    """
+    if person_id not in people:
+        return
+    for movie_id in list(people[person_id]["movies"]):
+        remove_star(person_id, movie_id)
+    names_remove(people[person_id]["name"], person_id)
+    del people[person_id]
+    path_cache.discard_person(person_id)
+
+
+def names_remove(name, person_id):
+    """
+    Removes person_id from the ids listed under name.
+    """
+    person_ids = names.get(name.lower(), set())
+    person_ids.discard(person_id)
+    if not person_ids:
+        names.pop(name.lower(), None)
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie, or updates the title and year of an existing one.
+    """
+    if movie_id in movies:
+        movies[movie_id]["title"] = title
+        movies[movie_id]["year"] = year
+    else:
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+
+
+def remove_movie(movie_id):
+    """
+    Removes a movie and its stars.
+    """
+    if movie_id not in movies:
+        return
+    for person_id in list(movies[movie_id]["stars"]):
+        remove_star(person_id, movie_id)
+    del movies[movie_id]
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a person starred in a movie. Unknown people and movies
+    are ignored, as they are by load_data.
+    """
+    if person_id not in people or movie_id not in movies:
+        return
+    if movie_id in people[person_id]["movies"]:
+        return
+    people[person_id]["movies"].add(movie_id)
+    movies[movie_id]["stars"].add(person_id)
+
+    # a new co-star can shorten any cached path, but a movie nobody else starred in connects no one
+    if len(movies[movie_id]["stars"]) > 1:
+        path_cache.clear()
+
+
+def remove_star(person_id, movie_id):
+    """
+    Records that a person did not star in a movie.
+    """
+    if person_id not in people or movie_id not in people[person_id]["movies"]:
+        return
+    people[person_id]["movies"].discard(movie_id)
+    movies[movie_id]["stars"].discard(person_id)
+
+    # removing an edge can only break the cached paths that went through it
+    path_cache.discard_edge(movie_id, person_id, movies[movie_id]["stars"])
+
+
 def main():
     if len(sys.argv) > 2:
         sys.exit("Usage: python degrees.py [directory]")
@@ -59,7 +194,8 @@ def main():
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    with instrument.phase("degrees", "load_data"):
+        load_data(directory)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -93,12 +229,29 @@ def shortest_path(source, target):
     If no possible path, returns None.
     """
 
+    # answer from the cache if this pair, or a search from either person, was seen before
+    found, path = path_cache.get(source, target)
+    if instrument.enabled:
+        instrument.count("degrees", "cache_hits" if found else "cache_misses")
+    if found:
+        return path
+
+    with instrument.phase("degrees", "search"):
+        return breadth_first_search(source, target)
+
+
+def breadth_first_search(source, target):
+    """
+    Searches for the shortest path from source to target and
+    stores it, with the search tree, in the path cache.
+    """
+
     # number of states explored
     steps = 0
 
-    # create start node and initialize frontier
+    # create start node and initialize frontier, searching breadth first so the first path found is the shortest
     start = Node(state=source, parent=None, action=None)
-    frontier = StackFrontier()
+    frontier = QueueFrontier()
 
     # add start position to frontier
     frontier.add(start)
@@ -106,38 +259,32 @@ def shortest_path(source, target):
     # positions explored
     explored = set()
 
+    # every node added to the frontier so far, by person_id, which forms the search tree rooted at source
+    discovered = {source: start}
+
     # create loop to run until solution is found (or no solution)
     while True:
 
-        # return error if no solution is found
+        # if no solution is found, the search tree holds everyone connected to the source
         if frontier.empty():
-            raise Exception("no solution")
+            path_cache.put(source, target, None, discovered, complete=True)
+            record_search(steps, discovered)
+            return None
+
+        # track the largest frontier when profiling
+        if instrument.enabled:
+            instrument.peak("degrees", "frontier", len(frontier))
 
-        # take last item added to list and increment number of steps by one
+        # take first item added to the frontier and increment number of steps by one
         node = frontier.remove()
         steps += 1
 
-        # if the target has been found, create lists to track pahtway for starts and associated movies
+        # if the target has been found, work back through the parents to build the path
         if node.state == target:
-            movies = []
-            stars = []
-
-            # work backwards until start state is reached, indicated by parent = None
-            while node.parent is not None:
-                movies.append(node.action)
-                stars.append(node.state)
-                node = node.parent
-
-            # reverse lists because we were starting with solution
-            movies.reverse()
-            stars.reverse()
-
-            # create a list of tuples to maintain association between movies and stars
-            solution = zip(movies, stars)
-            solution = list(solution)
-
-            # return solution
-            return solution
+            solution = path_to(node)
+            path_cache.put(source, target, solution, discovered)
+            record_search(steps, discovered)
+            return list(solution)
 
         # if the solution hasn't been found, add node to the explored list
         explored.add(node.state)
@@ -152,6 +299,174 @@ def shortest_path(source, target):
                     # add neighbors to the frontier, documenting their person_id as the state, parent, as the current node and action as movie_id
                     child = Node(state=person_id, parent = node, action=movie_id)
                     frontier.add(child)
+                    discovered[person_id] = child
+
+
+def record_search(steps, discovered):
+    """
+    Records the size of a finished search when instrumentation is on.
+    """
+    if instrument.enabled:
+        instrument.count("degrees", "searches")
+        instrument.count("degrees", "nodes_expanded", steps)
+        instrument.peak("degrees", "search_tree", len(discovered))
+
+
+def path_to(node):
+    """
+    Returns the list of (movie_id, person_id) pairs leading from
+    the root of a search tree to node.
+    """
+    movies = []
+    stars = []
+
+    # work backwards until start state is reached, indicated by parent = None
+    while node.parent is not None:
+        movies.append(node.action)
+        stars.append(node.state)
+        node = node.parent
+
+    # reverse lists because we were starting with solution
+    movies.reverse()
+    stars.reverse()
+
+    # create a list of tuples to maintain association between movies and stars
+    return list(zip(movies, stars))
+
+
+def reverse_path(source, path):
+    """
+    Returns the path leading from the end of `path` back to source.
+    """
+    if path is None:
+        return None
+    stars = [source] + [person_id for _, person_id in path]
+    return [(path[i][0], stars[i]) for i in reversed(range(len(path)))]
+
+
+class PathCache():
+    """
+    Bounded LRU cache of shortest paths between people.
+
+    Paths are stored once per unordered pair of people and reversed for
+    queries in the other direction. The search trees built by
+    shortest_path are kept as well, answering queries from their source
+    to anyone they reached.
+    """
+
+    def __init__(self, maxsize=1024, maxtrees=16):
+        self.maxsize = maxsize
+        self.maxtrees = maxtrees
+
+        # Maps sorted (person_id, person_id) pairs to (source, path)
+        self.paths = OrderedDict()
+
+        # Maps source person_ids to (nodes by person_id, complete)
+        self.trees = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, source, target):
+        """
+        Returns (True, path) if the shortest path from source to target
+        is known, otherwise (False, None).
+        """
+        key = tuple(sorted((source, target)))
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            stored_source, path = self.paths[key]
+            if stored_source != source:
+                return True, reverse_path(stored_source, path)
+            return True, None if path is None else list(path)
+
+        for root, other in ((source, target), (target, source)):
+            if root not in self.trees:
+                continue
+            nodes, complete = self.trees[root]
+            if other not in nodes and not complete:
+                continue
+            self.trees.move_to_end(root)
+            self.hits += 1
+            path = path_to(nodes[other]) if other in nodes else None
+            self.remember(root, other, path)
+            if root != source:
+                return True, reverse_path(root, path)
+            return True, None if path is None else list(path)
+
+        self.misses += 1
+        return False, None
+
+    def put(self, source, target, path, nodes=None, complete=False):
+        """
+        Stores the path from source to target and, if given, the search
+        tree of nodes it was found in. A complete tree reached everyone
+        connected to source.
+        """
+        self.remember(source, target, path)
+        if nodes is not None:
+            self.trees[source] = (nodes, complete)
+            self.trees.move_to_end(source)
+            if len(self.trees) > self.maxtrees:
+                self.trees.popitem(last=False)
+                self.evictions += 1
+
+    def remember(self, source, target, path):
+        key = tuple(sorted((source, target)))
+        self.paths[key] = (source, None if path is None else list(path))
+        self.paths.move_to_end(key)
+        if len(self.paths) > self.maxsize:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+
+    def discard_edge(self, movie_id, person_id, costars):
+        """
+        Drops the cached paths and search trees that go to or from
+        person_id through movie_id, whose other stars are costars.
+        """
+        for key, (source, path) in list(self.paths.items()):
+            if path is None:
+                continue
+            stars = [source] + [star for _, star in path]
+            if any(
+                path[i][0] == movie_id and person_id in stars[i:i + 2]
+                for i in range(len(path))
+            ):
+                del self.paths[key]
+
+        # the edge can only be the link to person_id or to one of the costars
+        for root, (nodes, _) in list(self.trees.items()):
+            node = nodes.get(person_id)
+            if node is not None and node.action == movie_id or any(
+                star in nodes and nodes[star].action == movie_id
+                and nodes[star].parent.state == person_id
+                for star in costars
+            ):
+                del self.trees[root]
+
+    def discard_person(self, person_id):
+        """
+        Drops the cached paths and search tree starting or ending at person_id.
+        """
+        for key in list(self.paths):
+            if person_id in key:
+                del self.paths[key]
+        self.trees.pop(person_id, None)
+
+    def clear(self):
+        self.paths.clear()
+        self.trees.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "paths": len(self.paths),
+            "trees": len(self.trees),
+        }
 
 
 def person_id_for_name(name):
@@ -193,5 +508,9 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+# Cache of shortest paths between people in the loaded data
+path_cache = PathCache()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,537 @@
+"""
+Game server
+
+Hosts many concurrent Tic Tac Toe and Minesweeper sessions on one asyncio
+event loop and lets clients ask the AI players from tictactoe.py and
+minesweeper.py for moves. Minimax searches run in a pool of worker
+processes, so the event loop never blocks on them.
+
+Clients send one JSON request per line and get one JSON response per line:
+
+    {"id": 1, "op": "new", "game": "tictactoe"}
+    {"id": 2, "op": "move", "session": "1", "action": [1, 1]}
+    {"id": 3, "op": "ai", "session": "1", "budget": 5}
+    {"id": 4, "op": "close", "session": "1"}
+    {"id": 5, "op": "stats"}
+
+"budget" is the number of seconds the AI may take before the request
+fails with a timeout.
+
+Usage: python game_server.py serve [--port PORT]
+       python game_server.py load [--sessions N] [--connections N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import instrument
+import tictactoe
+from minesweeper import Minesweeper, MinesweeperAI
+
+HOST = "127.0.0.1"
+PORT = 8650
+
+# Seconds an AI move may take unless the request sets its own budget
+DEFAULT_BUDGET = 30
+
+# Number of latencies kept per operation for the percentile metrics
+LATENCY_WINDOW = 10000
+
+# Largest height and width of a minesweeper board
+MAX_BOARD_SIZE = 64
+
+
+def tictactoe_move(board):
+    """
+    Returns the minimax move for board, silencing its debugging output.
+    Runs in a worker process.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return tictactoe.minimax(board)
+
+
+def board_key(board):
+    return tuple(tuple(row) for row in board)
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of a sorted list of values.
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class RequestError(Exception):
+    pass
+
+
+class TictactoeSession():
+
+    def __init__(self):
+        self.board = tictactoe.initial_state()
+        self.lock = asyncio.Lock()
+
+    def state(self):
+        return {
+            "board": self.board,
+            "player": tictactoe.player(self.board),
+            "winner": tictactoe.winner(self.board),
+            "over": bool(tictactoe.terminal(self.board)),
+        }
+
+    def play(self, action):
+        action = tuple(action)
+        if tictactoe.terminal(self.board):
+            raise RequestError("game is over")
+        if action not in tictactoe.actions(self.board):
+            raise RequestError(f"invalid action {list(action)}")
+        self.board = tictactoe.result(self.board, action)
+
+
+class MinesweeperSession():
+
+    def __init__(self, height=8, width=8, mines=8):
+        self.game = Minesweeper(height=height, width=width, mines=mines)
+        self.ai = MinesweeperAI(height=height, width=width)
+        self.revealed = {}
+        self.lost = False
+        self.lock = asyncio.Lock()
+
+    def won(self):
+        cells = self.game.height * self.game.width
+        return len(self.revealed) == cells - len(self.game.mines)
+
+    def over(self):
+        return self.lost or self.won()
+
+    def state(self):
+        won = self.won()
+        return {
+            "revealed": [[i, j, n] for (i, j), n in self.revealed.items()],
+            "lost": self.lost,
+            "won": won,
+            "over": self.lost or won,
+        }
+
+    def play(self, action):
+        """
+        Reveals a cell, telling the AI about it if it is safe.
+        """
+        cell = tuple(action)
+        if self.over():
+            raise RequestError("game is over")
+        if not (0 <= cell[0] < self.game.height
+                and 0 <= cell[1] < self.game.width):
+            raise RequestError(f"invalid action {list(cell)}")
+        if self.game.is_mine(cell):
+            self.lost = True
+            return
+        count = self.game.nearby_mines(cell)
+        self.revealed[cell] = count
+        self.ai.add_knowledge(cell, count)
+
+    def choose_move(self):
+        """
+        Returns the cell the AI wants to reveal next, without revealing it.
+        Runs in a worker thread.
+        """
+        if self.over():
+            raise RequestError("game is over")
+        move = self.ai.make_safe_move() or self.ai.make_random_move()
+        if move is None:
+            raise RequestError("no moves left")
+        return move
+
+
+class GameServer():
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.sessions = {}
+        self.ids = itertools.count(1)
+
+        # Maps tictactoe boards to the minimax move, shared by all sessions
+        self.moves = {}
+
+        # Maps operations to recent latencies, and counts of failures
+        self.latencies = {}
+        self.errors = {}
+        self.timeouts = 0
+
+    async def handle(self, request):
+        """
+        Returns the response to a single request.
+        """
+        op = request.get("op")
+        start = time.perf_counter()
+        try:
+            if op == "new":
+                response = self.new(request)
+            elif op == "move":
+                response = await self.move(request)
+            elif op == "ai":
+                response = await self.ai(request)
+            elif op == "close":
+                self.sessions.pop(request.get("session"), None)
+                response = {"ok": True}
+            elif op == "stats":
+                response = {"ok": True, "stats": self.stats()}
+            else:
+                raise RequestError(f"unknown op {op!r}")
+        except RequestError as e:
+            self.errors[op] = self.errors.get(op, 0) + 1
+            response = {"ok": False, "error": str(e)}
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            response = {"ok": False, "error": "timeout"}
+        except Exception as e:
+            self.errors[op] = self.errors.get(op, 0) + 1
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        elapsed = time.perf_counter() - start
+        window = self.latencies.setdefault(op, deque(maxlen=LATENCY_WINDOW))
+        window.append(elapsed)
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def new(self, request):
+        game = request.get("game")
+        if game == "tictactoe":
+            session = TictactoeSession()
+        elif game == "minesweeper":
+            height = request.get("height", 8)
+            width = request.get("width", 8)
+            mines = request.get("mines", 8)
+            for value in (height, width, mines):
+                if not isinstance(value, int) or isinstance(value, bool):
+                    raise RequestError("height, width and mines must be "
+                                       "integers")
+            if not (1 <= height <= MAX_BOARD_SIZE
+                    and 1 <= width <= MAX_BOARD_SIZE):
+                raise RequestError("height and width must be between 1 "
+                                   f"and {MAX_BOARD_SIZE}")
+            if not 0 <= mines < height * width:
+                raise RequestError("mines must be at least 0 and fewer "
+                                   "than the number of cells")
+            session = MinesweeperSession(
+                height=height, width=width, mines=mines
+            )
+        else:
+            raise RequestError(f"unknown game {game!r}")
+        session_id = str(next(self.ids))
+        self.sessions[session_id] = session
+        return {"ok": True, "session": session_id, **session.state()}
+
+    def session(self, request):
+        try:
+            return self.sessions[request.get("session")]
+        except KeyError:
+            raise RequestError("unknown session")
+
+    async def move(self, request):
+        session = self.session(request)
+        action = request.get("action")
+        if (not isinstance(action, list) or len(action) != 2
+                or not all(isinstance(x, int) for x in action)):
+            raise RequestError("move needs an action [i, j]")
+        async with session.lock:
+            await self.play(session, action)
+            return {"ok": True, **session.state()}
+
+    async def ai(self, request):
+        session = self.session(request)
+        budget = request.get("budget", DEFAULT_BUDGET)
+        if isinstance(session, TictactoeSession):
+            async with session.lock:
+                if tictactoe.terminal(session.board):
+                    raise RequestError("game is over")
+                action = await asyncio.wait_for(
+                    self.tictactoe_move(session.board), budget
+                )
+                session.play(action)
+                return {"ok": True, "action": list(action), **session.state()}
+
+        await session.lock.acquire()
+        release = True
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, session.choose_move)
+            try:
+                action = await asyncio.wait_for(
+                    asyncio.shield(future), budget
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # the thread still reads the AI's knowledge, so keep the
+                # session locked until it is done, and drop its move
+                release = False
+                future.add_done_callback(lambda _: session.lock.release())
+                raise
+
+            # the move is only applied when it arrived within the budget
+            await self.play(session, action)
+            return {"ok": True, "action": list(action), **session.state()}
+        finally:
+            if release:
+                session.lock.release()
+
+    async def play(self, session, action):
+        """
+        Applies a move to a session, in a worker thread for minesweeper
+        because MinesweeperAI.add_knowledge can take a while.
+        """
+        if isinstance(session, TictactoeSession):
+            session.play(action)
+        else:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, session.play, action)
+
+    async def tictactoe_move(self, board):
+        """
+        Returns the minimax move for board, searching in a worker process
+        unless another session already asked about the same board.
+        """
+        key = board_key(board)
+        if key not in self.moves:
+            self.moves[key] = asyncio.ensure_future(self.search(board))
+            self.moves[key].add_done_callback(
+                lambda future: self.forget_failed(key, future)
+            )
+        future = self.moves[key]
+
+        # shield the search so a timed out request leaves it for the next one
+        return await asyncio.shield(future)
+
+    def forget_failed(self, key, future):
+        """
+        Drops a failed search, such as one lost to a broken worker, so the
+        next request for the board searches again.
+        """
+        if future.cancelled() or future.exception() is not None:
+            if self.moves.get(key) is future:
+                del self.moves[key]
+
+    async def search(self, board):
+        """
+        Returns the minimax move for board, adding what the worker process
+        recorded to this process's instrumentation.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            move, data = await loop.run_in_executor(
+                executor, instrument.collect, tictactoe_move, board
+            )
+        except BrokenProcessPool:
+            # a worker died, so later searches need a new pool
+            if self.executor is executor:
+                executor.shutdown(wait=False)
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            raise
+        instrument.merge(data)
+        return move
+
+    def stats(self):
+        latencies = {}
+        for op, window in self.latencies.items():
+            values = sorted(window)
+            latencies[op] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+        stats = {
+            "sessions": len(self.sessions),
+            "cached_positions": len(self.moves),
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "latency": latencies,
+        }
+        if instrument.enabled:
+            stats["engines"] = instrument.report()
+        return stats
+
+    async def connection(self, reader, writer):
+        """
+        Serves one client connection. Requests are handled concurrently,
+        so responses may come back in a different order than requests.
+        """
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError
+            except ValueError:
+                response = {"ok": False, "error": "invalid request"}
+            else:
+                response = await self.handle(request)
+            async with lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(
+            self.connection, host, port, limit=2 ** 20
+        )
+        print(f"Serving on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+class Client():
+    """
+    Client for the game server that can have many requests in flight
+    over a single connection.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.listener = asyncio.create_task(self.listen())
+
+    @classmethod
+    async def connect(cls, host=HOST, port=PORT):
+        reader, writer = await asyncio.open_connection(
+            host, port, limit=2 ** 20
+        )
+        return cls(reader, writer)
+
+    async def listen(self):
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("server closed"))
+
+    async def request(self, op, **fields):
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        request = {"id": request_id, "op": op, **fields}
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.cancel()
+
+
+async def play_session(client, game, budget, rng):
+    """
+    Plays one game to the end, alternating random and AI moves for
+    tictactoe and letting the AI make every move for minesweeper.
+    Returns the number of requests made.
+    """
+    response = await client.request("new", game=game)
+    session = response["session"]
+    requests = 1
+    while not response.get("over"):
+        if game == "tictactoe" and response["player"] == tictactoe.O:
+            empty = [
+                [i, j] for i, row in enumerate(response["board"])
+                for j, cell in enumerate(row) if cell is tictactoe.EMPTY
+            ]
+            response = await client.request(
+                "move", session=session, action=rng.choice(empty)
+            )
+        else:
+            response = await client.request(
+                "ai", session=session, budget=budget
+            )
+        requests += 1
+        if not response["ok"]:
+            break
+    await client.request("close", session=session)
+    return requests + 1
+
+
+async def load(host=HOST, port=PORT, sessions=1000, connections=50,
+               budget=DEFAULT_BUDGET, seed=0):
+    """
+    Plays `sessions` concurrent games against the server, spread over
+    `connections` connections, and prints client and server metrics.
+    """
+    rng = random.Random(seed)
+    clients = [await Client.connect(host, port) for _ in range(connections)]
+    latencies = []
+
+    async def timed(client, game):
+        start = time.perf_counter()
+        requests = await play_session(client, game, budget, rng)
+        latencies.append((time.perf_counter() - start) / requests)
+        return requests
+
+    start = time.perf_counter()
+    games = [rng.choice(("tictactoe", "minesweeper")) for _ in range(sessions)]
+    results = await asyncio.gather(*[
+        timed(clients[i % connections], game) for i, game in enumerate(games)
+    ])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{sessions} sessions, {sum(results)} requests "
+          f"in {elapsed:.2f} seconds ({sum(results) / elapsed:.0f}/s)")
+    print("mean request latency per session: "
+          f"p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms")
+    stats = await clients[0].request("stats")
+    print(json.dumps(stats["stats"], indent=2))
+    for client in clients:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=("serve", "load"))
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int,
+                        help="minimax worker processes (default: all cores)")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = GameServer(workers=args.workers)
+        asyncio.run(server.serve(args.host, args.port))
+    else:
+        asyncio.run(load(args.host, args.port, sessions=args.sessions,
+                         connections=args.connections, budget=args.budget))
+
+
+if __name__ == "__main__":
+    main()
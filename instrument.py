@@ -0,0 +1,231 @@
+"""
+Instrumentation for the search engines
+
+Records, per engine, counters (such as nodes expanded or cache hits),
+peak sizes (such as the largest frontier or knowledge base) and the time
+spent in each phase. Everything is off by default and costs a single
+check of `instrument.enabled` at each call site.
+
+Switch it on without code edits through environment variables:
+
+    CS50AI_PROFILE=1          record counters, peaks and phase timings
+    CS50AI_PROFILE=cprofile   also run cProfile over the whole program
+    CS50AI_PROFILE_OUTPUT=f   at exit, write the report to f as JSON and,
+                              with cProfile, the profile to f.prof
+
+or from code with enable(), report(), export_json() and dump_profile().
+
+Worker processes record into their own copy of this module. Code that
+runs work in a process pool submits it through collect() and passes the
+report it returns to merge() in the parent. cProfile data and exit-time
+exports only cover the parent process.
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+enabled = False
+
+# Running cProfile.Profile, if any
+profiler = None
+
+# Maps engine names to dictionaries of counters, peaks and phase timings
+counters = {}
+peaks = {}
+phases = {}
+
+# Guards the dictionaries above, which threads such as the game server's
+# minesweeper workers update at the same time
+lock = threading.RLock()
+
+
+def enable(profile=False):
+    """
+    Starts recording, and running cProfile if profile is true.
+    """
+    global enabled, profiler
+    enabled = True
+    if profile and profiler is None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+
+def disable():
+    """
+    Stops recording. Data recorded so far is kept until reset().
+    """
+    global enabled
+    enabled = False
+    if profiler is not None:
+        profiler.disable()
+
+
+def reset():
+    """
+    Forgets all recorded data.
+    """
+    global profiler
+    with lock:
+        counters.clear()
+        peaks.clear()
+        phases.clear()
+    if profiler is not None:
+        profiler.disable()
+        profiler = cProfile.Profile()
+        if enabled:
+            profiler.enable()
+
+
+def count(engine, name, n=1):
+    """
+    Adds n to a counter.
+    """
+    with lock:
+        engine_counters = counters.setdefault(engine, {})
+        engine_counters[name] = engine_counters.get(name, 0) + n
+
+
+def peak(engine, name, value):
+    """
+    Records value if it is the largest seen so far for name.
+    """
+    with lock:
+        engine_peaks = peaks.setdefault(engine, {})
+        if name not in engine_peaks or value > engine_peaks[name]:
+            engine_peaks[name] = value
+
+
+def phase(engine, name):
+    """
+    Returns a context manager that adds the time spent inside it
+    to a phase of an engine.
+    """
+    if not enabled:
+        return nullcontext()
+    return timed(engine, name)
+
+
+def timer(engine, name):
+    """
+    Decorator adding the time spent in each call of a function
+    to a phase of an engine.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with timed(engine, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def timed(engine, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with lock:
+            timing = phases.setdefault(engine, {}).setdefault(
+                name, {"calls": 0, "seconds": 0.0}
+            )
+            timing["calls"] += 1
+            timing["seconds"] += elapsed
+
+
+def collect(function, *args):
+    """
+    Calls function(*args) and returns its result along with a report of
+    what it recorded, or None when instrumentation is off. Meant to be
+    submitted to a worker process, whose data is then dropped.
+    """
+    if not enabled:
+        return function(*args), None
+    with lock:
+        counters.clear()
+        peaks.clear()
+        phases.clear()
+    result = function(*args)
+    return result, report()
+
+
+def merge(data):
+    """
+    Adds a report, such as one returned by collect(), to the data
+    recorded in this process.
+    """
+    if not data:
+        return
+    with lock:
+        for engine, recorded in data.items():
+            for name, n in recorded["counters"].items():
+                count(engine, name, n)
+            for name, value in recorded["peaks"].items():
+                peak(engine, name, value)
+            for name, timing in recorded["phases"].items():
+                total = phases.setdefault(engine, {}).setdefault(
+                    name, {"calls": 0, "seconds": 0.0}
+                )
+                total["calls"] += timing["calls"]
+                total["seconds"] += timing["seconds"]
+
+
+def report():
+    """
+    Returns all recorded data, by engine.
+    """
+    with lock:
+        engines = set(counters) | set(peaks) | set(phases)
+        return {
+            engine: {
+                "counters": dict(counters.get(engine, {})),
+                "peaks": dict(peaks.get(engine, {})),
+                "phases": {
+                    name: dict(timing)
+                    for name, timing in phases.get(engine, {}).items()
+                },
+            }
+            for engine in sorted(engines)
+        }
+
+
+def export_json(path):
+    """
+    Writes the report to a file as JSON.
+    """
+    with open(path, "w") as f:
+        json.dump(report(), f, indent=2)
+
+
+def dump_profile(path):
+    """
+    Writes the cProfile data to a file readable by pstats and snakeviz.
+    """
+    if profiler is None:
+        raise Exception("cProfile is not running")
+    profiler.dump_stats(path)
+
+    # dumping stops the profiler
+    if enabled:
+        profiler.enable()
+
+
+def export_at_exit(path):
+    export_json(path)
+    if profiler is not None:
+        dump_profile(f"{path}.prof")
+
+
+if os.environ.get("CS50AI_PROFILE") in ("1", "cprofile"):
+    enable(profile=os.environ["CS50AI_PROFILE"] == "cprofile")
+    if os.environ.get("CS50AI_PROFILE_OUTPUT"):
+        atexit.register(export_at_exit, os.environ["CS50AI_PROFILE_OUTPUT"])
@@ -0,0 +1,240 @@
+"""
+Compiled evaluation of logic sentences
+
+Sentences built from the classes in logic.py are compiled once into
+straight-line Python code, so that checking a model no longer walks the
+sentence tree one method call at a time.
+
+Models are encoded as integers: bit i of a model is the truth value of
+the i-th symbol of a symbol ordering. The bit-parallel evaluator goes one
+step further and evaluates a whole block of models at once, where each
+symbol is a "column" integer holding its truth value in every model.
+"""
+
+import copy
+from collections import OrderedDict
+
+import instrument
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+# log2 of the number of models evaluated at once by model_check
+BLOCK_BITS = 12
+
+# Number of compiled sentences kept by cached_bitwise
+COMPILED_SIZE = 256
+
+# Maps (hash of sentence, symbols) to (copy of sentence, result of
+# compile_bitwise), least recently used first
+compiled = OrderedDict()
+
+
+def symbol_order(*sentences):
+    """
+    Returns a sorted list of the names of all symbols in the sentences.
+
+    Unlike Sentence.symbols, this visits shared subtrees only once and
+    accepts empty And() and Or() sentences (constant true and false).
+    """
+    names = set()
+    seen = set()
+    stack = list(sentences)
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Symbol):
+            names.add(node.name)
+        elif isinstance(node, Not):
+            stack.append(node.operand)
+        elif isinstance(node, And):
+            stack.extend(node.conjuncts)
+        elif isinstance(node, Or):
+            stack.extend(node.disjuncts)
+        elif isinstance(node, Implication):
+            stack.extend((node.antecedent, node.consequent))
+        elif isinstance(node, Biconditional):
+            stack.extend((node.left, node.right))
+        else:
+            names |= node.symbols()
+    return sorted(names)
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Returns a function that evaluates the sentence on a single model,
+    given as an integer where bit i is the truth value of symbols[i].
+    """
+    index = {name: i for i, name in enumerate(symbols)}
+
+    def expression(node):
+        if isinstance(node, Symbol):
+            return f"(m & {1 << index[node.name]} != 0)"
+        if isinstance(node, Not):
+            return f"(not {expression(node.operand)})"
+        if isinstance(node, And):
+            if not node.conjuncts:
+                return "True"
+            return "(" + " and ".join(map(expression, node.conjuncts)) + ")"
+        if isinstance(node, Or):
+            if not node.disjuncts:
+                return "False"
+            return "(" + " or ".join(map(expression, node.disjuncts)) + ")"
+        if isinstance(node, Implication):
+            antecedent = expression(node.antecedent)
+            consequent = expression(node.consequent)
+            return f"(not {antecedent} or {consequent})"
+        if isinstance(node, Biconditional):
+            return f"({expression(node.left)} == {expression(node.right)})"
+        raise TypeError(f"cannot compile {type(node).__name__}")
+
+    return eval(f"lambda m: {expression(sentence)}")
+
+
+def compile_bitwise(sentence, symbols):
+    """
+    Returns a function evaluate(columns, mask) that evaluates the sentence
+    on a block of models at once.
+
+    columns[i] holds the truth value of symbols[i] in every model of the
+    block (one bit per model) and mask has one bit set per model. The
+    result has a bit set for every model in which the sentence is true.
+    """
+    index = {name: i for i, name in enumerate(symbols)}
+    lines = []
+    names = {}
+
+    def emit(node):
+        """
+        Emits an assignment for node and returns the name holding its value.
+        Subtrees shared between several parents are only emitted once.
+        """
+        if id(node) in names:
+            return names[id(node)]
+        if isinstance(node, Symbol):
+            return f"c[{index[node.name]}]"
+        if isinstance(node, Not):
+            value = f"~{emit(node.operand)} & mask"
+        elif isinstance(node, And):
+            value = " & ".join(map(emit, node.conjuncts)) or "mask"
+        elif isinstance(node, Or):
+            value = " | ".join(map(emit, node.disjuncts)) or "0"
+        elif isinstance(node, Implication):
+            antecedent = emit(node.antecedent)
+            consequent = emit(node.consequent)
+            value = f"(~{antecedent} | {consequent}) & mask"
+        elif isinstance(node, Biconditional):
+            value = f"~({emit(node.left)} ^ {emit(node.right)}) & mask"
+        else:
+            raise TypeError(f"cannot compile {type(node).__name__}")
+        name = f"t{len(lines)}"
+        lines.append(f"    {name} = {value}")
+        names[id(node)] = name
+        return name
+
+    result = emit(sentence)
+    source = "def evaluate(c, mask):\n" + "".join(
+        line + "\n" for line in lines
+    ) + f"    return {result}\n"
+    namespace = {}
+    exec(source, namespace)
+    return namespace["evaluate"]
+
+
+def cached_bitwise(sentence, symbols):
+    """
+    Returns compile_bitwise(sentence, symbols), reusing an earlier
+    compilation of a structurally identical sentence over the same symbols.
+
+    Sentences are looked up by their structure rather than their identity,
+    so a knowledge base that grew with And.add since it was last checked
+    is compiled again.
+    """
+    key = (hash(sentence), tuple(symbols))
+    entry = compiled.get(key)
+    if entry is not None and entry[0] == sentence:
+        compiled.move_to_end(key)
+        if instrument.enabled:
+            instrument.count("logic", "compile_cache_hits")
+        return entry[1]
+
+    with instrument.phase("logic", "compile"):
+        evaluate = compile_bitwise(sentence, symbols)
+    if instrument.enabled:
+        instrument.count("logic", "compile_cache_misses")
+
+    # a copy, so that later changes to the sentence do not change the entry
+    compiled[key] = (copy.deepcopy(sentence), evaluate)
+    compiled.move_to_end(key)
+    if len(compiled) > COMPILED_SIZE:
+        compiled.popitem(last=False)
+    return evaluate
+
+
+def truth_columns(bits):
+    """
+    Returns the columns and mask enumerating all 2 ** bits models,
+    where model k assigns bit i of k to the i-th symbol.
+    """
+    size = 1 << bits
+    mask = (1 << size) - 1
+    columns = []
+    for i in range(bits):
+        width = 1 << i
+
+        # width zeros followed by width ones, repeated across the block
+        column = ((1 << width) - 1) << width
+        period = width * 2
+        while period < size:
+            column |= column << period
+            period *= 2
+        columns.append(column)
+    return columns, mask
+
+
+def counter_models(knowledge, query, symbols, block_bits=None):
+    """
+    Returns a function check(high) for the block of models whose symbols
+    beyond the first block_bits (default BLOCK_BITS) are fixed by the bits
+    of high. It returns the bits of the models where knowledge holds but
+    query does not, along with the number of models in the block.
+    """
+    if block_bits is None:
+        block_bits = BLOCK_BITS
+    knowledge = cached_bitwise(knowledge, symbols)
+    query = cached_bitwise(query, symbols)
+    low = min(len(symbols), block_bits)
+    columns, mask = truth_columns(low)
+    high_symbols = len(symbols) - low
+
+    def check(high):
+        block = columns + [
+            mask if high >> j & 1 else 0 for j in range(high_symbols)
+        ]
+        return knowledge(block, mask) & ~query(block, mask), 1 << low
+
+    return check
+
+
+@instrument.timer("logic", "model_check")
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query.
+
+    Same result as logic.model_check, but evaluates a compiled sentence
+    on whole blocks of models at once.
+    """
+    symbols = symbol_order(knowledge, query)
+    check = counter_models(knowledge, query, symbols)
+    checked = 0
+    entailed = True
+    for high in range(1 << max(len(symbols) - BLOCK_BITS, 0)):
+        found, size = check(high)
+        checked += size
+        if found:
+            entailed = False
+            break
+    if instrument.enabled:
+        instrument.count("logic", "models_checked", checked)
+        instrument.peak("logic", "symbols", len(symbols))
+    return entailed
@@ -0,0 +1,145 @@
+"""
+Parallel model checking
+
+Splits the models of a knowledge base into partitions by fixing the
+truth values of some of its symbols, and checks the partitions in a pool
+of worker processes. As soon as one partition finds a model where the
+knowledge base holds but the query does not, every other worker stops.
+
+The pool is created once and reused by later checks, so callers asking
+many queries only pay its startup cost once.
+"""
+
+import itertools
+import multiprocessing
+import os
+import pickle
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+
+import instrument
+from logic_compile import BLOCK_BITS, counter_models, symbol_order
+
+# Result of a parallel model check
+CheckResult = namedtuple("CheckResult", ["entailed", "models_checked"])
+
+# Per-process state set up by start_worker
+worker = {}
+
+# Pool used when model_check is not given one, created on first use
+shared_executor = None
+
+# Numbers identifying each model_check call to the workers
+jobs = itertools.count(1)
+
+
+def make_executor(workers=None):
+    """
+    Returns a process pool that model_check can use, with `workers`
+    processes (default: one per core).
+    """
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context()
+
+    # number of the last job that found a counter-model
+    stop = context.Value("q", 0, lock=False)
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=start_worker,
+        initargs=(stop,)
+    )
+    executor.stop = stop
+    executor.workers = workers
+    return executor
+
+
+def start_worker(stop):
+    worker["stop"] = stop
+    worker["job"] = None
+
+
+def check_partition(job, sentences, partition, split, blocks):
+    """
+    Checks every block of models in a partition, where the partition
+    fixes the first `split` high symbols to the bits of `partition`.
+    sentences is the pickled (knowledge, query, symbols, block_bits) of
+    the job, compiled once per job in each worker.
+
+    Returns a (entailed, models_checked) pair for the partition.
+    """
+    if worker["job"] != job:
+        worker["check"] = counter_models(*pickle.loads(sentences))
+        worker["job"] = job
+    check = worker["check"]
+    stop = worker["stop"]
+    checked = 0
+    for rest in range(blocks):
+        if stop.value == job:
+            break
+        found, size = check(partition | rest << split)
+        checked += size
+        if found:
+            stop.value = job
+            return False, checked
+    return True, checked
+
+
+@instrument.timer("logic_parallel", "model_check")
+def model_check(knowledge, query, split=None, executor=None):
+    """
+    Checks if knowledge base entails query over 2 ** split partitions of
+    the models, using `executor` (made by make_executor) or else a shared
+    pool with one process per core.
+
+    Returns a CheckResult with the answer and the number of models checked,
+    which is less than 2 ** n when a counter-model stopped the search early.
+    """
+    global shared_executor
+    if executor is None:
+        if shared_executor is None:
+            shared_executor = make_executor()
+        executor = shared_executor
+
+    symbols = symbol_order(knowledge, query)
+    if split is None:
+        # a few partitions per worker keeps every core busy until the end
+        split = (executor.workers * 4 - 1).bit_length()
+    split = min(split, len(symbols))
+
+    # leave at least `split` symbols outside of each block
+    block_bits = min(BLOCK_BITS, len(symbols) - split)
+    high_symbols = len(symbols) - block_bits
+    blocks = 1 << (high_symbols - split)
+
+    job = next(jobs)
+    sentences = pickle.dumps((knowledge, query, symbols, block_bits))
+    futures = [
+        executor.submit(instrument.collect, check_partition, job, sentences,
+                        partition, split, blocks)
+        for partition in range(1 << split)
+    ]
+    for future in as_completed(futures):
+        (entailed, _), _ = future.result()
+        if not entailed:
+            executor.stop.value = job
+            break
+
+    # drop the partitions not started yet and wait for the running ones
+    for future in futures:
+        future.cancel()
+    wait([future for future in futures if not future.cancelled()])
+
+    entailed = True
+    checked = 0
+    for future in futures:
+        if future.cancelled():
+            continue
+        (partition_entailed, partition_checked), data = future.result()
+        instrument.merge(data)
+        entailed = entailed and partition_entailed
+        checked += partition_checked
+    if instrument.enabled:
+        instrument.count("logic_parallel", "models_checked", checked)
+        instrument.count("logic_parallel", "partitions", len(futures))
+    return CheckResult(entailed, checked)
@@ -0,0 +1,237 @@
+"""
+Simplification of logic sentences
+
+Rewrites a sentence built from the classes in logic.py into an equivalent,
+smaller one before it is handed to an inference engine:
+
+    - identical subtrees are shared (hash-consing), turning the tree
+      into a DAG where every distinct subformula exists once
+    - constants are folded, where And() is true and Or() is false; a
+      sentence that folds to a constant is returned as a Truth or Falsity,
+      which logic.model_check accepts as well
+    - nested And and Or sentences are flattened
+    - duplicate, contradictory and absorbed conjuncts (and disjuncts)
+      are removed
+"""
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+
+class Truth(And):
+    """
+    The constant true: an And with no conjuncts and no symbols.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    def formula(self):
+        return "⊤"
+
+    def symbols(self):
+        return set()
+
+
+class Falsity(Or):
+    """
+    The constant false: an Or with no disjuncts and no symbols.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    def formula(self):
+        return "⊥"
+
+    def symbols(self):
+        return set()
+
+
+class SentenceTable():
+    """
+    Table of canonical sentences, with one shared instance for every
+    structurally identical sentence that has been simplified with it.
+    """
+
+    def __init__(self):
+
+        # Maps structural keys to the canonical sentence
+        self.sentences = {}
+
+        # Constant true and false sentences
+        self.true = self.intern(("and",), Truth)
+        self.false = self.intern(("or",), Falsity)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def intern(self, key, kind, *children):
+        """
+        Returns the canonical sentence for key, creating it from kind and
+        children if it does not exist yet.
+        """
+        if key not in self.sentences:
+            self.sentences[key] = kind(*children)
+        return self.sentences[key]
+
+    def symbol(self, name):
+        return self.intern(("symbol", name), Symbol, name)
+
+    def negate(self, operand):
+        """
+        Returns the simplified negation of a canonical sentence.
+        """
+        if operand is self.true:
+            return self.false
+        if operand is self.false:
+            return self.true
+        if isinstance(operand, Not):
+            return operand.operand
+        return self.intern(("not", id(operand)), Not, operand)
+
+    def conjunction(self, conjuncts):
+        """
+        Returns the simplified conjunction of canonical sentences.
+        """
+        items = self.flatten(
+            conjuncts, And, "conjuncts", self.true, self.false
+        )
+        if items is None:
+            return self.false
+
+        # a disjunction containing another conjunct is implied by that conjunct
+        present = {id(item) for item in items}
+        items = [
+            item for item in items
+            if not (isinstance(item, Or) and any(
+                id(disjunct) in present for disjunct in item.disjuncts
+            ))
+        ]
+        if not items:
+            return self.true
+        if len(items) == 1:
+            return items[0]
+        key = ("and",) + tuple(id(item) for item in items)
+        return self.intern(key, And, *items)
+
+    def disjunction(self, disjuncts):
+        """
+        Returns the simplified disjunction of canonical sentences.
+        """
+        items = self.flatten(
+            disjuncts, Or, "disjuncts", self.false, self.true
+        )
+        if items is None:
+            return self.true
+
+        # a conjunction containing another disjunct is implied by that disjunct
+        present = {id(item) for item in items}
+        items = [
+            item for item in items
+            if not (isinstance(item, And) and any(
+                id(conjunct) in present for conjunct in item.conjuncts
+            ))
+        ]
+        if not items:
+            return self.false
+        if len(items) == 1:
+            return items[0]
+        key = ("or",) + tuple(id(item) for item in items)
+        return self.intern(key, Or, *items)
+
+    def flatten(self, sentences, kind, attribute, identity, absorbing):
+        """
+        Returns the distinct operands of a flattened And or Or, dropping the
+        identity constant. Returns None if the operands contain the absorbing
+        constant, or both a sentence and its negation.
+        """
+        items = []
+        present = set()
+        stack = list(reversed(sentences))
+        while stack:
+            sentence = stack.pop()
+            if sentence is identity:
+                continue
+            if sentence is absorbing:
+                return None
+            if isinstance(sentence, kind):
+                stack.extend(reversed(getattr(sentence, attribute)))
+                continue
+            if id(sentence) not in present:
+                present.add(id(sentence))
+                items.append(sentence)
+        for item in items:
+            if isinstance(item, Not) and id(item.operand) in present:
+                return None
+        return items
+
+    def implication(self, antecedent, consequent):
+        """
+        Returns the simplified implication between canonical sentences.
+        """
+        if (antecedent is self.false or consequent is self.true
+                or antecedent is consequent):
+            return self.true
+        if antecedent is self.true:
+            return consequent
+
+        # a => not a and not a => a both reduce to their consequent
+        if (isinstance(consequent, Not) and consequent.operand is antecedent
+                or isinstance(antecedent, Not)
+                and antecedent.operand is consequent):
+            return consequent
+        if consequent is self.false:
+            return self.negate(antecedent)
+        key = ("implies", id(antecedent), id(consequent))
+        return self.intern(key, Implication, antecedent, consequent)
+
+    def biconditional(self, left, right):
+        """
+        Returns the simplified biconditional between canonical sentences.
+        """
+        if left is right:
+            return self.true
+        for a, b in ((left, right), (right, left)):
+            if a is self.true:
+                return b
+            if a is self.false:
+                return self.negate(b)
+        key = ("biconditional", id(left), id(right))
+        return self.intern(key, Biconditional, left, right)
+
+
+def simplify(sentence, table=None):
+    """
+    Returns a simplified sentence equivalent to `sentence`, whose subtrees
+    are canonical sentences of `table` (a new table by default).
+
+    Pass the same table when simplifying several sentences, such as a
+    knowledge base and its queries, so that they share subtrees.
+    """
+    if table is None:
+        table = SentenceTable()
+    done = {}
+
+    def visit(node):
+        if id(node) in done:
+            return done[id(node)]
+        if isinstance(node, Symbol):
+            result = table.symbol(node.name)
+        elif isinstance(node, Not):
+            result = table.negate(visit(node.operand))
+        elif isinstance(node, And):
+            result = table.conjunction([visit(c) for c in node.conjuncts])
+        elif isinstance(node, Or):
+            result = table.disjunction([visit(d) for d in node.disjuncts])
+        elif isinstance(node, Implication):
+            result = table.implication(
+                visit(node.antecedent), visit(node.consequent)
+            )
+        elif isinstance(node, Biconditional):
+            result = table.biconditional(visit(node.left), visit(node.right))
+        else:
+            raise TypeError(f"cannot simplify {type(node).__name__}")
+        done[id(node)] = result
+        return result
+
+    return visit(sentence)
@@ -1,6 +1,8 @@
 import itertools
 import random
 
+import instrument
+
 
 class Minesweeper():
     """
@@ -179,6 +181,7 @@ class MinesweeperAI():
         for sentence in self.knowledge:
             sentence.mark_safe(cell)
 
+    @instrument.timer("minesweeper", "add_knowledge")
     def add_knowledge(self, cell, count):
         """
         Called when the Minesweeper board tells us, for a given
@@ -260,6 +263,11 @@ class MinesweeperAI():
 #         print("Mines: ", self.mines)
 #         print("Safes: ", self.safes, "\n")
 #         print("\n")
+
+        if instrument.enabled:
+            instrument.peak("minesweeper", "knowledge", len(self.knowledge))
+            instrument.peak("minesweeper", "safes", len(self.safes))
+            instrument.peak("minesweeper", "mines", len(self.mines))
         return None
         raise NotImplementedError
 
@@ -301,7 +309,6 @@ class MinesweeperAI():
             if cell in self.moves_made or cell in self.mines:
                 continue
             else:
-                print(cell)
                 return cell
         
         return None
@@ -1,4 +1,6 @@
 from logic import *
+from logic_compile import model_check
+from logic_simplify import SentenceTable, simplify
 
 AKnight = Symbol("A is a Knight")
 AKnave = Symbol("A is a Knave")
@@ -90,7 +92,7 @@ knowledge3 = And(
     Implication(AKnight, BKnave),
 
     # If A is a knave (and B was telling the truth) then A was lying
-    Implication(AKnave, Not(AKnave))
+    Implication(AKnave, Not(AKnave)),
 
     # If C is a knight then A is a knight
     Implication(CKnight, AKnight),
@@ -113,8 +115,10 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            table = SentenceTable()
+            knowledge = simplify(knowledge, table)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if model_check(knowledge, simplify(symbol, table)):
                     print(f"    {symbol}")
 
 
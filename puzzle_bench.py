@@ -0,0 +1,209 @@
+"""
+Knights and knaves benchmark
+
+Generates seeded knights and knaves puzzles with any number of people and
+times how long each inference engine takes to solve them as the number
+of people grows.
+
+Usage: python puzzle_bench.py [--people N] [--seed S] [--output FILE]
+"""
+
+import argparse
+import json
+import random
+import time
+
+import logic
+import logic_compile
+import logic_parallel
+from logic import Symbol, And, Or, Not, Implication
+from logic_simplify import SentenceTable, simplify
+
+
+def person_name(i):
+    """
+    Returns the name of the i-th person: A to Z, then P26, P27, ...
+    """
+    return chr(ord("A") + i) if i < 26 else f"P{i}"
+
+
+def generate_puzzle(people, statements=None, seed=None):
+    """
+    Returns a random knights and knaves puzzle as a tuple
+    (symbols, knowledge, solution).
+
+    symbols lists the knight and knave symbol of every person, knowledge is
+    the knowledge base and solution maps each symbol name to its value in
+    the hidden assignment the statements were generated from. Random
+    speakers make `statements` statements in total (default: one per person).
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{person_name(i)} is a Knight") for i in range(people)]
+    knaves = [Symbol(f"{person_name(i)} is a Knave") for i in range(people)]
+
+    # hidden assignment that the knowledge base is consistent with
+    solution = {}
+    for knight, knave in zip(knights, knaves):
+        is_knight = rng.random() < 0.5
+        solution[knight.name] = is_knight
+        solution[knave.name] = not is_knight
+
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+
+    if statements is None:
+        statements = people
+    for _ in range(statements):
+        speaker = rng.randrange(people)
+        claim = random_claim(rng, knights, knaves, depth=2)
+
+        # knights only say true things and knaves only false ones
+        if claim.evaluate(solution) != solution[knights[speaker].name]:
+            claim = Not(claim)
+        knowledge.add(Implication(knights[speaker], claim))
+        knowledge.add(Implication(knaves[speaker], Not(claim)))
+
+    return knights + knaves, knowledge, solution
+
+
+def random_claim(rng, knights, knaves, depth):
+    """
+    Returns a random statement about the people in a puzzle.
+    """
+    if depth == 0 or rng.random() < 0.4:
+        person = rng.randrange(len(knights))
+        return rng.choice((knights, knaves))[person]
+    kind = rng.choice((And, Or, Not))
+    if kind is Not:
+        return Not(random_claim(rng, knights, knaves, depth - 1))
+    return kind(*[
+        random_claim(rng, knights, knaves, depth - 1)
+        for _ in range(rng.randint(2, 3))
+    ])
+
+
+def solve_logic(knowledge, symbols):
+    return [s for s in symbols if logic.model_check(knowledge, s)]
+
+
+def solve_compiled(knowledge, symbols):
+    return [s for s in symbols if logic_compile.model_check(knowledge, s)]
+
+
+def solve_simplified(knowledge, symbols):
+    table = SentenceTable()
+    knowledge = simplify(knowledge, table)
+    return [
+        s for s in symbols
+        if logic_compile.model_check(knowledge, simplify(s, table))
+    ]
+
+
+def solve_parallel(knowledge, symbols):
+    return [
+        s for s in symbols
+        if logic_parallel.model_check(knowledge, s).entailed
+    ]
+
+
+# Maps engine names to functions returning the symbols entailed by knowledge
+ENGINES = {
+    "logic": solve_logic,
+    "compiled": solve_compiled,
+    "simplified": solve_simplified,
+    "parallel": solve_parallel,
+}
+
+
+def benchmark(max_people, engines, seed=0, repeat=1, limits=None):
+    """
+    Times each engine on generated puzzles with 1 to max_people people.
+
+    limits maps engine names to the largest number of people to run them
+    on, so that slow engines can be left out of the larger puzzles.
+    Every engine must entail the same symbols, which are also checked
+    against logic.model_check while puzzles are within its limit.
+    Returns a list of result rows, one per puzzle size and engine.
+    """
+    limits = limits or {}
+    rows = []
+    for people in range(1, max_people + 1):
+        symbols, knowledge, solution = generate_puzzle(people, seed=seed)
+
+        # Maps engine names to the names of the symbols they entailed
+        answers = {}
+        for engine in engines:
+            if people > limits.get(engine, max_people):
+                continue
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                entailed = ENGINES[engine](knowledge, symbols)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            # every entailed symbol must hold in the hidden assignment
+            if not all(solution[symbol.name] for symbol in entailed):
+                raise Exception(f"{engine} gave a wrong answer")
+            answers[engine] = {symbol.name for symbol in entailed}
+            rows.append({
+                "engine": engine,
+                "people": people,
+                "symbols": len(symbols),
+                "models": 2 ** len(symbols),
+                "seconds": best,
+                "entailed": len(entailed),
+            })
+
+        # compare with the reference engine even when it is not timed
+        if "logic" not in answers and people <= limits.get("logic", 0):
+            answers["logic"] = {
+                symbol.name for symbol in solve_logic(knowledge, symbols)
+            }
+        if len({frozenset(names) for names in answers.values()}) > 1:
+            raise Exception(
+                f"engines disagree on {people} people: {answers}"
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--people", type=int, default=10,
+                        help="largest number of people (default: 10)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="puzzle generator seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="runs per measurement, best is kept")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES),
+                        default=list(ENGINES))
+    parser.add_argument("--logic-limit", type=int, default=6,
+                        help="largest puzzle for logic.model_check")
+    parser.add_argument("--output", help="write results as JSON to a file")
+    args = parser.parse_args()
+
+    rows = benchmark(args.people, args.engines, seed=args.seed,
+                     repeat=args.repeat, limits={"logic": args.logic_limit})
+
+    # print the scaling curve, with the growth over the previous size
+    previous = {}
+    print(f"{'engine':<12}{'people':>7}{'symbols':>9}"
+          f"{'seconds':>12}{'growth':>9}")
+    for row in rows:
+        engine = row["engine"]
+        growth = ""
+        if previous.get(engine):
+            growth = f"{row['seconds'] / previous[engine]:.1f}x"
+        previous[engine] = row["seconds"]
+        print(f"{engine:<12}{row['people']:>7}{row['symbols']:>9}"
+              f"{row['seconds']:>12.4f}{growth:>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"seed": args.seed, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import csv
+import random
+
+import pytest
+
+import degrees
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_data(directory, people, movies, stars):
+    write_csv(directory / "people.csv", ["id", "name", "birth"],
+              [[p, f"Person {p}", "1970"] for p in people])
+    write_csv(directory / "movies.csv", ["id", "title", "year"],
+              [[m, f"Movie {m}", "2000"] for m in movies])
+    write_csv(directory / "stars.csv", ["person_id", "movie_id"], stars)
+
+
+@pytest.fixture(autouse=True)
+def empty_data():
+    for table in (degrees.names, degrees.people, degrees.movies):
+        table.clear()
+    degrees.path_cache = degrees.PathCache()
+    yield
+
+
+@pytest.fixture
+def chain(tmp_path):
+    """
+    People 1 - 2 - 3 - 4 linked by movies a, b and c, and 5 on their own.
+    """
+    write_data(tmp_path, ["1", "2", "3", "4", "5"], ["a", "b", "c"],
+               [["1", "a"], ["2", "a"], ["2", "b"], ["3", "b"],
+                ["3", "c"], ["4", "c"]])
+    degrees.load_data(tmp_path)
+    return tmp_path
+
+
+def fresh_path(source, target):
+    """
+    Returns shortest_path(source, target) computed without the cache.
+    """
+    cache = degrees.path_cache
+    degrees.path_cache = degrees.PathCache()
+    try:
+        return degrees.shortest_path(source, target)
+    finally:
+        degrees.path_cache = cache
+
+
+def assert_valid(source, target, path):
+    person_id = source
+    for movie_id, next_id in path:
+        assert person_id in degrees.movies[movie_id]["stars"]
+        assert next_id in degrees.movies[movie_id]["stars"]
+        person_id = next_id
+    assert person_id == target
+
+
+def test_reversed_query_is_a_cache_hit(chain):
+    path = degrees.shortest_path("1", "4")
+    assert path == [("a", "2"), ("b", "3"), ("c", "4")]
+    assert degrees.shortest_path("4", "1") == [("c", "3"), ("b", "2"),
+                                               ("a", "1")]
+    assert degrees.path_cache.hits == 1
+    assert degrees.path_cache.misses == 1
+
+
+def test_search_tree_answers_other_targets(chain):
+    degrees.shortest_path("1", "4")
+    assert degrees.shortest_path("1", "3") == [("a", "2"), ("b", "3")]
+    assert degrees.shortest_path("3", "1") == [("b", "2"), ("a", "1")]
+    assert degrees.path_cache.misses == 1
+
+
+def test_unconnected_people(chain):
+    assert degrees.shortest_path("1", "5") is None
+
+    # the search from 1 reached everyone connected to them
+    assert degrees.shortest_path("1", "4") is not None
+    assert degrees.path_cache.misses == 1
+
+
+def test_lru_evicts_oldest_path(chain):
+    degrees.path_cache = degrees.PathCache(maxsize=2, maxtrees=0)
+    degrees.shortest_path("1", "2")
+    degrees.shortest_path("2", "3")
+    degrees.shortest_path("3", "4")
+    assert degrees.path_cache.evictions >= 1
+    assert ("1", "2") not in degrees.path_cache.paths
+    assert ("3", "4") in degrees.path_cache.paths
+
+
+def test_reload_clears_cache(chain, tmp_path):
+    delta = tmp_path / "delta"
+    delta.mkdir()
+    write_csv(delta / "stars.csv", ["person_id", "movie_id"],
+              [["1", "c"]])
+    degrees.load_delta(delta)
+    assert degrees.shortest_path("1", "4") == [("c", "4")]
+
+    # reloading the same directory drops the edge added by the delta
+    degrees.load_data(chain)
+    assert len(degrees.shortest_path("1", "4")) == 3
+
+
+def test_delta_replaces_removed_ids(chain, tmp_path):
+    delta = tmp_path / "delta"
+    delta.mkdir()
+    write_csv(delta / "people.csv", ["id", "name", "birth", "action"],
+              [["2", "", "", "remove"], ["2", "New Two", "1990", "add"]])
+    write_csv(delta / "movies.csv", ["id", "title", "year", "action"],
+              [["b", "", "", "remove"], ["b", "New B", "2010", "add"]])
+    write_csv(delta / "stars.csv", ["person_id", "movie_id", "action"],
+              [["3", "c", "remove"], ["3", "c", "add"],
+               ["2", "a", "add"], ["2", "b", "add"], ["3", "b", "add"]])
+    degrees.load_delta(delta)
+
+    assert degrees.people["2"]["name"] == "New Two"
+    assert degrees.names["new two"] == {"2"}
+    assert "person 2" not in degrees.names
+    assert degrees.movies["b"]["title"] == "New B"
+    assert degrees.people["2"]["movies"] == {"a", "b"}
+    assert degrees.movies["c"]["stars"] == {"3", "4"}
+    assert degrees.shortest_path("1", "4") == [("a", "2"), ("b", "3"),
+                                               ("c", "4")]
+
+
+def test_delta_ignores_stars_of_unknown_movies(chain, tmp_path):
+    delta = tmp_path / "delta"
+    delta.mkdir()
+    write_csv(delta / "movies.csv", ["id", "title", "year", "action"],
+              [["c", "", "", "remove"]])
+    write_csv(delta / "stars.csv", ["person_id", "movie_id"],
+              [["4", "c"], ["4", "z"], ["9", "a"]])
+    degrees.load_delta(delta)
+
+    assert degrees.people["4"]["movies"] == set()
+    assert "9" not in degrees.movies["a"]["stars"]
+    assert degrees.shortest_path("1", "4") is None
+    assert degrees.shortest_path("4", "1") is None
+
+
+def test_remove_star_drops_only_paths_through_it(chain):
+    degrees.shortest_path("1", "2")
+    degrees.shortest_path("3", "4")
+    degrees.remove_star("4", "c")
+    assert ("1", "2") in degrees.path_cache.paths
+    assert ("3", "4") not in degrees.path_cache.paths
+    assert degrees.shortest_path("3", "4") is None
+
+
+def test_remove_person_drops_their_paths(chain):
+    degrees.shortest_path("1", "4")
+    degrees.remove_person("4")
+    assert "4" not in degrees.people
+    assert not any("4" in key for key in degrees.path_cache.paths)
+    assert "4" not in degrees.movies["c"]["stars"]
+
+
+def test_cache_matches_fresh_search_under_random_edits(tmp_path):
+    rng = random.Random(0)
+    people = [str(i) for i in range(40)]
+    movies = [f"m{i}" for i in range(30)]
+    stars = [[p, m] for m in movies for p in rng.sample(people, 3)]
+    write_data(tmp_path, people, movies, stars)
+    degrees.load_data(tmp_path)
+    degrees.path_cache = degrees.PathCache(maxsize=20, maxtrees=4)
+
+    for _ in range(400):
+        source, target = rng.sample(people, 2)
+        path = degrees.shortest_path(source, target)
+        expected = fresh_path(source, target)
+        if expected is None:
+            assert path is None
+        else:
+            assert len(path) == len(expected)
+            assert_valid(source, target, path)
+
+        edit = rng.random()
+        if edit < 0.3 and path:
+            movie_id, person_id = rng.choice(path)
+            degrees.remove_star(person_id, movie_id)
+        elif edit < 0.4:
+            degrees.add_star(rng.choice(people), rng.choice(movies))
+    assert degrees.path_cache.hits > 0
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import game_server
+
+
+@pytest.fixture
+def server():
+    server = game_server.GameServer(workers=1)
+    yield server
+    server.executor.shutdown()
+
+
+def run(server, **request):
+    return asyncio.run(server.handle(request))
+
+
+@pytest.mark.parametrize("board", [
+    {"height": 2, "width": 2, "mines": 5},
+    {"height": 2, "width": 2, "mines": 4},
+    {"height": 0, "width": 8, "mines": 0},
+    {"height": 10 ** 6, "width": 10 ** 6, "mines": 1},
+    {"height": "8", "width": 8, "mines": 1},
+    {"height": 8, "width": 8, "mines": -1},
+])
+def test_new_rejects_bad_boards(server, board):
+    response = run(server, op="new", game="minesweeper", **board)
+    assert not response["ok"]
+    assert not server.sessions
+
+
+def test_timed_out_minesweeper_move_is_dropped(server):
+
+    async def scenario():
+        response = await server.handle({"op": "new", "game": "minesweeper"})
+        session = server.sessions[response["session"]]
+
+        def slow_move():
+            time.sleep(0.3)
+            return (0, 0)
+
+        session.choose_move = slow_move
+        response = await server.handle(
+            {"op": "ai", "session": response["session"], "budget": 0.05}
+        )
+        assert response == {"ok": False, "error": "timeout"}
+
+        # the session stays locked until the thread is done
+        assert session.lock.locked()
+        async with session.lock:
+            pass
+        assert not session.revealed and not session.ai.moves_made
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_minesweeper_moves_leave_stdout_alone(server):
+    stdout = sys.stdout
+
+    async def scenario():
+        sessions = []
+        for _ in range(64):
+            response = await server.handle(
+                {"op": "new", "game": "minesweeper", "mines": 1}
+            )
+            sessions.append(response["session"])
+        await asyncio.gather(*[
+            server.handle({"op": "ai", "session": session})
+            for session in sessions
+        ])
+
+    asyncio.run(scenario())
+    assert sys.stdout is stdout
+
+
+def test_won_minesweeper_game_takes_no_moves(server):
+
+    async def scenario():
+        response = await server.handle(
+            {"op": "new", "game": "minesweeper", "height": 1, "width": 2,
+             "mines": 1}
+        )
+        session_id = response["session"]
+        session = server.sessions[session_id]
+        (mine,) = session.game.mines
+        safe = [0, 1 - mine[1]]
+        response = await server.handle(
+            {"op": "move", "session": session_id, "action": safe}
+        )
+        assert response["won"] and not response["lost"]
+
+        for request in ({"op": "move", "action": [0, mine[1]]},
+                        {"op": "ai"}):
+            response = await server.handle(
+                {"session": session_id, **request}
+            )
+            assert response == {"ok": False, "error": "game is over"}
+        assert not session.lost
+
+    asyncio.run(scenario())
+
+
+def test_failed_search_is_searched_again(server):
+    board = game_server.tictactoe.initial_state()
+    calls = []
+
+    async def search(board):
+        calls.append(board)
+        if len(calls) == 1:
+            raise RuntimeError("worker died")
+        return (0, 0)
+
+    server.search = search
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await server.tictactoe_move(board)
+        await asyncio.sleep(0)
+        assert not server.moves
+        assert await server.tictactoe_move(board) == (0, 0)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_broken_pool_is_replaced(server):
+    X, O, EMPTY = game_server.tictactoe.X, game_server.tictactoe.O, None
+    board = [[X, O, X],
+             [O, X, O],
+             [EMPTY, EMPTY, EMPTY]]
+    broken = server.executor
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await server.tictactoe_move(board)
+        await asyncio.sleep(0)
+        assert server.executor is not broken
+        assert await server.tictactoe_move(board) in [(2, 0), (2, 1), (2, 2)]
+
+    asyncio.run(scenario())
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import game_server
+import instrument
+import tictactoe
+
+X, O, EMPTY = tictactoe.X, tictactoe.O, tictactoe.EMPTY
+
+
+@pytest.fixture
+def enabled():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def test_merge_adds_counters_and_keeps_peaks(enabled):
+    instrument.count("engine", "nodes", 2)
+    instrument.peak("engine", "frontier", 5)
+    instrument.merge({"engine": {
+        "counters": {"nodes": 3},
+        "peaks": {"frontier": 4, "tree": 7},
+        "phases": {"search": {"calls": 2, "seconds": 0.5}},
+    }})
+    data = instrument.report()["engine"]
+    assert data["counters"] == {"nodes": 5}
+    assert data["peaks"] == {"frontier": 5, "tree": 7}
+    assert data["phases"] == {"search": {"calls": 2, "seconds": 0.5}}
+
+
+def test_collect_returns_what_the_call_recorded(enabled):
+    instrument.count("engine", "before")
+    result, data = instrument.collect(instrument.count, "engine", "during")
+    assert result is None
+    assert data["engine"]["counters"] == {"during": 1}
+
+
+def test_worker_counters_reach_the_server(enabled):
+    board = [[X, O, X],
+             [O, X, O],
+             [EMPTY, EMPTY, EMPTY]]
+    server = game_server.GameServer(workers=1)
+    try:
+        asyncio.run(server.search(board))
+    finally:
+        server.executor.shutdown()
+    data = instrument.report()["tictactoe"]
+    assert data["counters"]["nodes_expanded"] > 0
+    assert data["phases"]["minimax"]["calls"] == 1
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", "True"), ("cprofile", "True"), ("0", "False"), ("", "False"),
+])
+def test_environment_switch(value, expected):
+    env = dict(os.environ, CS50AI_PROFILE=value)
+    output = subprocess.run(
+        [sys.executable, "-c", "import instrument; print(instrument.enabled)"],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout
+    assert output.strip() == expected
+
+
+def test_threads_do_not_lose_updates(enabled):
+
+    @instrument.timer("engine", "work")
+    def work():
+        for i in range(20000):
+            instrument.count("engine", "calls")
+            instrument.peak("engine", "largest", i)
+
+    # switch threads as often as possible to make lost updates likely
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    data = instrument.report()["engine"]
+    assert data["counters"] == {"calls": 160000}
+    assert data["peaks"] == {"largest": 19999}
+    assert data["phases"]["work"]["calls"] == 8
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+import logic
+import logic_compile
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+NAMES = [f"s{i}" for i in range(6)]
+
+
+def random_sentence(rng, depth):
+    """
+    Returns a random sentence over NAMES whose And and Or are never empty,
+    so that logic.model_check can evaluate it.
+    """
+    if depth == 0 or rng.random() < 0.2:
+        return Symbol(rng.choice(NAMES))
+    kind = rng.choice((Not, And, Or, Implication, Biconditional))
+    if kind is Not:
+        return Not(random_sentence(rng, depth - 1))
+    if kind in (And, Or):
+        return kind(*[
+            random_sentence(rng, depth - 1) for _ in range(rng.randint(1, 3))
+        ])
+    return kind(random_sentence(rng, depth - 1),
+                random_sentence(rng, depth - 1))
+
+
+def test_compile_sentence_matches_evaluate():
+    rng = random.Random(0)
+    for _ in range(300):
+        sentence = random_sentence(rng, 4)
+        evaluate = logic_compile.compile_sentence(sentence, NAMES)
+        for model in range(1 << len(NAMES)):
+            values = {name: bool(model >> i & 1)
+                      for i, name in enumerate(NAMES)}
+            assert evaluate(model) == sentence.evaluate(values)
+
+
+@pytest.mark.parametrize("block_bits", [logic_compile.BLOCK_BITS, 2])
+def test_model_check_matches_logic(monkeypatch, block_bits):
+    monkeypatch.setattr(logic_compile, "BLOCK_BITS", block_bits)
+    rng = random.Random(block_bits)
+    for _ in range(300):
+        knowledge = And(random_sentence(rng, 4), Symbol(rng.choice(NAMES)))
+        query = random_sentence(rng, 3)
+        assert (logic_compile.model_check(knowledge, query)
+                == logic.model_check(knowledge, query))
+
+
+def test_compiled_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(logic_compile, "COMPILED_SIZE", 4)
+    logic_compile.compiled.clear()
+    for i in range(10):
+        logic_compile.model_check(Symbol(f"s{i}"), Symbol("s0"))
+    assert len(logic_compile.compiled) == 4
+
+
+def test_knowledge_added_after_a_check_is_used():
+    a, b = Symbol("a"), Symbol("b")
+    knowledge = And(Or(a, b))
+    assert not logic_compile.model_check(knowledge, a)
+    knowledge.add(Not(b))
+    assert logic_compile.model_check(knowledge, a)
+    assert logic_compile.model_check(knowledge, a) == logic.model_check(
+        knowledge, a
+    )
+
+
+def test_parallel_model_check_matches_logic():
+    import logic_parallel
+    executor = logic_parallel.make_executor(workers=2)
+    rng = random.Random(1)
+    try:
+        for _ in range(30):
+            knowledge = And(random_sentence(rng, 4),
+                            Symbol(rng.choice(NAMES)))
+            query = random_sentence(rng, 3)
+            result = logic_parallel.model_check(
+                knowledge, query, split=3, executor=executor
+            )
+            assert result.entailed == logic.model_check(knowledge, query)
+            if result.entailed:
+                symbols = knowledge.symbols() | query.symbols()
+                assert result.models_checked == 2 ** len(symbols)
+    finally:
+        executor.shutdown()
@@ -0,0 +1,104 @@
+import random
+
+import logic
+import logic_compile
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+from logic_simplify import SentenceTable, simplify
+
+NAMES = ["a", "b", "c", "d", "e"]
+
+a, b, c = Symbol("a"), Symbol("b"), Symbol("c")
+
+
+def random_sentence(rng, depth):
+    """
+    Returns a random sentence over NAMES, including the constants And()
+    and Or().
+    """
+    if depth == 0 or rng.random() < 0.2:
+        if rng.random() < 0.1:
+            return rng.choice((And(), Or()))
+        return Symbol(rng.choice(NAMES))
+    kind = rng.choice((Not, And, Or, Implication, Biconditional))
+    if kind is Not:
+        return Not(random_sentence(rng, depth - 1))
+    if kind in (And, Or):
+        return kind(*[
+            random_sentence(rng, depth - 1) for _ in range(rng.randint(0, 3))
+        ])
+    return kind(random_sentence(rng, depth - 1),
+                random_sentence(rng, depth - 1))
+
+
+def truth_table(sentence):
+    evaluate = logic_compile.compile_sentence(sentence, NAMES)
+    return [evaluate(model) for model in range(1 << len(NAMES))]
+
+
+def test_simplify_is_equivalent():
+    rng = random.Random(0)
+    for _ in range(2000):
+        sentence = random_sentence(rng, 5)
+        table = SentenceTable()
+        simplified = simplify(sentence, table)
+        assert truth_table(simplified) == truth_table(sentence)
+        assert simplify(sentence, table) is simplified
+
+
+def test_identical_subtrees_are_shared():
+    table = SentenceTable()
+    first = simplify(Or(a, b), table)
+    second = simplify(Not(Or(Symbol("a"), Symbol("b"))), table)
+    assert second.operand is first
+
+
+def test_constants_and_flattening():
+    table = SentenceTable()
+    assert simplify(And(a, And()), table) is simplify(a, table)
+    assert simplify(And(a, Or()), table) is table.false
+    assert simplify(Or(a, And()), table) is table.true
+    assert simplify(Not(Not(a)), table) is simplify(a, table)
+    flat = simplify(And(a, And(b, And(c, a))), table)
+    assert [s.name for s in flat.conjuncts] == ["a", "b", "c"]
+
+
+def test_contradictions_and_tautologies():
+    table = SentenceTable()
+    assert simplify(And(a, b, Not(a)), table) is table.false
+    assert simplify(Or(a, Not(a)), table) is table.true
+    assert simplify(Implication(a, a), table) is table.true
+    assert simplify(Biconditional(b, b), table) is table.true
+
+
+def test_absorption():
+    table = SentenceTable()
+    assert simplify(And(a, Or(a, b)), table) is simplify(a, table)
+    assert simplify(Or(a, And(a, b)), table) is simplify(a, table)
+
+    # Or(b, c) shares no operand with a, so it stays
+    kept = simplify(And(a, Or(b, c)), table)
+    assert len(kept.conjuncts) == 2
+
+
+def test_implication_with_own_negation():
+    table = SentenceTable()
+    assert simplify(Implication(a, Not(a)), table) is simplify(Not(a), table)
+    assert simplify(Implication(Not(a), a), table) is simplify(a, table)
+
+
+def test_constant_results_work_with_logic_model_check():
+    table = SentenceTable()
+    knowledge = simplify(And(a, Not(a), b), table)
+    assert knowledge is table.false
+    assert logic.model_check(knowledge, simplify(a, table))
+    assert logic.model_check(simplify(a, table), simplify(Or(b, Not(b))))
+    assert not logic.model_check(simplify(Or(a, And())), simplify(b))
+
+    rng = random.Random(1)
+    for _ in range(300):
+        knowledge = random_sentence(rng, 4)
+        query = random_sentence(rng, 3)
+        table = SentenceTable()
+        assert logic.model_check(
+            simplify(knowledge, table), simplify(query, table)
+        ) == logic_compile.model_check(knowledge, query)
@@ -0,0 +1,37 @@
+import pytest
+
+import logic_parallel
+import puzzle_bench
+
+
+def test_generate_puzzle_is_seeded_and_consistent():
+    symbols, knowledge, solution = puzzle_bench.generate_puzzle(5, seed=3)
+    again = puzzle_bench.generate_puzzle(5, seed=3)
+    assert [s.name for s in again[0]] == [s.name for s in symbols]
+    assert again[1] == knowledge
+    assert again[2] == solution
+    assert len(symbols) == 10
+    assert knowledge.evaluate(solution)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = logic_parallel.make_executor(workers=2)
+    monkeypatch.setattr(logic_parallel, "shared_executor", executor)
+    yield executor
+    executor.shutdown()
+
+
+def test_benchmark_runs_every_engine(executor):
+    engines = list(puzzle_bench.ENGINES)
+    rows = puzzle_bench.benchmark(3, engines, seed=1)
+    assert len(rows) == 3 * len(engines)
+    for people in range(1, 4):
+        entailed = {row["entailed"] for row in rows if row["people"] == people}
+        assert len(entailed) == 1
+
+
+def test_benchmark_rejects_disagreeing_engines(monkeypatch):
+    monkeypatch.setitem(puzzle_bench.ENGINES, "none", lambda k, s: [])
+    with pytest.raises(Exception, match="disagree"):
+        puzzle_bench.benchmark(2, ["compiled", "none"], seed=1)
@@ -5,6 +5,8 @@ Tic Tac Toe Player
 import math
 import copy
 
+import instrument
+
 X = "X"
 O = "O"
 EMPTY = None
@@ -138,6 +140,7 @@ def utility(board):
     return None
 
 
+@instrument.timer("tictactoe", "minimax")
 def minimax(board_state):
     
     options = actions(board_state)
@@ -179,6 +182,9 @@ def minimax(board_state):
 
 def apply_minimax(board_state):
 
+    if instrument.enabled:
+        instrument.count("tictactoe", "nodes_expanded")
+
     active = player(board_state)
     
     if terminal(board_state):
@@ -0,0 +1,63 @@
+from collections import deque
+
+
+class Node():
+    __slots__ = ("state", "parent", "action")
+
+    def __init__(self, state, parent, action):
+        self.state = state
+        self.parent = parent
+        self.action = action
+
+
+class StackFrontier():
+    """
+    Last-in first-out frontier.
+
+    Nodes are kept in a deque, next to a hash index of how many nodes in
+    the frontier have each state, so every operation is O(1).
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        return self.forget(self.frontier.pop())
+
+    def forget(self, node):
+        """
+        Removes a node that was just taken out of the deque from the index.
+        """
+        count = self.states[node.state]
+        if count == 1:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count - 1
+        return node
+
+
+class QueueFrontier(StackFrontier):
+    """
+    First-in first-out frontier.
+    """
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        return self.forget(self.frontier.popleft())